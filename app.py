@@ -2,26 +2,50 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Tuple
 import argparse
+import asyncio
 from src.memory.memory_service import MemoryService
 from src.agents import Coordinator
 
 
-def run_and_capture(coord: Coordinator, question: str) -> str:
-    res = coord.handle(question)
+def run_and_capture(coord: Coordinator, question: str, plan: List[str] | None = None) -> str:
+    res = coord.handle(question, plan=plan)
     return res.content
 
 
+async def run_scenarios(coord: Coordinator, scenarios: List[Tuple[str, str]], outputs_dir: Path) -> None:
+    # Planning is the only network-bound step, so plan all scenarios concurrently.
+    # Execution stays in order: later scenarios recall what earlier ones stored.
+    try:
+        plans: List[Dict[str, Any]] = await asyncio.gather(*(coord.aclassify(q) for _, q in scenarios))
+    finally:
+        await coord.azure_llm.aclose()
+
+    # File writes go to worker threads so they overlap with the next scenario
+    writes: List[asyncio.Task] = []
+    for (fname, q), plan in zip(scenarios, plans):
+        print("==== Question ====")
+        print(q)
+        print("==================")
+        ans = run_and_capture(coord, q, plan=plan["plan"])
+        writes.append(asyncio.create_task(asyncio.to_thread((outputs_dir / fname).write_text, ans, encoding="utf-8")))
+        await asyncio.sleep(0)  # let the task hand the write to its thread before we continue
+        print(ans)
+        print()
+    await asyncio.gather(*writes)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run multi-agent scenarios or interact with agents")
     parser.add_argument("--out-dir", default="outputs", help="Directory to write scenario outputs (batch mode)")
     parser.add_argument("--prompt", default=None, help="Run a single user->agents turn with the given prompt")
     parser.add_argument("--interactive", action="store_true", help="Start a simple REPL to chat with the agents (enter blank line or 'exit' to quit)")
     parser.add_argument("--out-file", default=None, help="Optional file to save the single-turn result when using --prompt")
+    parser.add_argument("--db", default=os.getenv("MEMORY_DB_PATH"), help="SQLite file to persist memory across runs (default: in-memory; env MEMORY_DB_PATH)")
     args = parser.parse_args()
 
-    mem = MemoryService()
+    mem = MemoryService(args.db)
     coord = Coordinator(mem)
 
     # Interactive REPL mode
@@ -58,14 +82,7 @@ def main():
         ("collaborative.txt", "Compare two machine-learning approaches and recommend which is better for our use case."),
     ]
 
-    for fname, q in scenarios:
-        print("==== Question ====")
-        print(q)
-        print("==================")
-        ans = run_and_capture(coord, q)
-        (outputs_dir / fname).write_text(ans, encoding="utf-8")
-        print(ans)
-        print()
+    asyncio.run(run_scenarios(coord, scenarios, outputs_dir))
 
     print(f"All scenarios executed. See {outputs_dir}/ folder.")
 
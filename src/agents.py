@@ -1,10 +1,47 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
 from dataclasses import dataclass
 from .memory.memory_service import MemoryService
+from .memory.semantic_cache import SemanticCache
+from .memory.vector_store import SimpleVectorizer
 from .llm.azure_openai import AzureLLM
 
+try:
+    import ahocorasick  # type: ignore
+except Exception:
+    # pyahocorasick is optional; fall back to plain substring scans
+    ahocorasick = None
+
+
+# Rule-based planner keywords (substring matches on the lowercased question)
+KEYWORD_TO_STEP: Dict[str, str] = {
+    **dict.fromkeys(["research", "find", "look up", "papers", "information", "what are", "list"], "research"),
+    **dict.fromkeys(["analyze", "compare", "efficiency", "trade-off", "recommend", "which is better", "summarize"], "analysis"),
+    **dict.fromkeys(["what did we", "earlier", "previously", "remember", "recall"], "memory"),
+}
+
+
+def _build_automaton():
+    if ahocorasick is None:
+        return None
+    ac = ahocorasick.Automaton()
+    for kw, step in KEYWORD_TO_STEP.items():
+        ac.add_word(kw, step)
+    ac.make_automaton()
+    return ac
+
+
+_AC = _build_automaton()
+
+
+def matched_steps(ql: str) -> set[str]:
+    """Plan steps whose keywords occur in the lowercased question (single pass when available)."""
+    if _AC is not None:
+        return {step for _, step in _AC.iter(ql)}
+    return {step for kw, step in KEYWORD_TO_STEP.items() if kw in ql}
+
 
 def trace_print(prefix: str, payload: Dict[str, Any]) -> None:
     print(f"[{prefix}] {payload}")
@@ -41,7 +78,10 @@ class AnalysisAgent:
 
     def analyze(self, data_points: List[str], goal: str | None = None) -> AgentResult:
         # simplistic scoring: length and diversity
-        coverage = len(set(" ".join(data_points).lower().split()))
+        unique: set[str] = set()
+        for dp in data_points:
+            unique.update(SimpleVectorizer.tokenize_document(dp))
+        coverage = len(unique)
         reasoning = f"Analyzed {len(data_points)} items with approx {coverage} unique tokens."
         if goal:
             reasoning += f" Goal: {goal}"
@@ -69,40 +109,97 @@ class Coordinator:
         self.analysis_agent = AnalysisAgent(memory)
         self.memory_agent = MemoryAgent(memory)
         self.azure_llm = AzureLLM()
+        self.cache = SemanticCache()
+        # LLM plans keyed by normalized question; shared by classify() and aclassify()
+        self._plan_cache: OrderedDict[str, Tuple[str, ...]] = OrderedDict()
+        self.plan_cache_size = 512
+
+    def _cached_plan(self, key: str) -> List[str] | None:
+        steps = self._plan_cache.get(key)
+        if steps is None:
+            return None
+        self._plan_cache.move_to_end(key)
+        return list(steps)
+
+    def _store_plan(self, key: str, steps: List[str]) -> None:
+        self._plan_cache[key] = tuple(steps)
+        if len(self._plan_cache) > self.plan_cache_size:
+            self._plan_cache.popitem(last=False)
 
     def classify(self, question: str) -> Dict[str, Any]:
-        ql = question.lower()
-        steps: List[str] = []
         # Try Azure OpenAI if configured
         if self.azure_llm.enabled:
+            key = question.strip().lower()
+            steps = self._cached_plan(key)
+            if steps:
+                return {"plan": steps}
             try:
                 steps = self.azure_llm.classify_plan(question)
                 if steps:
+                    self._store_plan(key, steps)
                     return {"plan": steps}
             except Exception:
                 # graceful fallback to rules when errors occur
-                steps = []
-        if any(k in ql for k in ["research", "find", "look up", "papers", "information", "what are", "list"]):
-            steps.append("research")
-        if any(k in ql for k in ["analyze", "compare", "efficiency", "trade-off", "recommend", "which is better", "summarize"]):
-            steps.append("analysis")
-        if any(k in ql for k in ["what did we", "earlier", "previously", "remember", "recall"]):
+                pass
+        # rule plans are cheap and not cached, so a failed LLM call is retried next time
+        return self._rule_plan(question)
+
+    async def aclassify(self, question: str) -> Dict[str, Any]:
+        """Async variant of classify(); lets several Azure planning calls overlap."""
+        if self.azure_llm.enabled:
+            key = question.strip().lower()
+            steps = self._cached_plan(key)
+            if steps:
+                return {"plan": steps}
+            try:
+                steps = await self.azure_llm.aclassify_plan(question)
+                if steps:
+                    self._store_plan(key, steps)
+                    return {"plan": steps}
+            except Exception:
+                pass
+        return self._rule_plan(question)
+
+    @staticmethod
+    def _rule_plan(question: str) -> Dict[str, Any]:
+        matched = matched_steps(question.lower())
+        steps: List[str] = [step for step in ("research", "analysis") if step in matched]
+        if "memory" in matched:
             steps = ["memory"] + steps
         if not steps:
             # default: research then analysis
             steps = ["research", "analysis"]
         return {"plan": steps}
 
-    def handle(self, question: str) -> AgentResult:
+    def _query_vec(self, question: str):
+        return self.memory.vstore.vec.vectorize(question, grow=False)
+
+    def _cache_lookup(self, question: str) -> AgentResult | None:
+        # a recall question must see what was stored since, and would otherwise
+        # match a cached non-recall answer to a similarly worded question
+        if "memory" in matched_steps(question.lower()):
+            return None
+        return self.cache.lookup(self._query_vec(question))
+
+    def handle(self, question: str, plan: List[str] | None = None) -> AgentResult:
+        """Run one turn. ``plan`` skips classification when it was computed ahead (see aclassify)."""
         self.memory.add_message("user", question)
-        plan = self.classify(question)["plan"]
+        cached = self._cache_lookup(question)
+        if cached is not None:
+            trace_print("manager.cache_hit", {"question": question})
+            self.memory.add_message("manager", cached.content, {"confidence": cached.confidence, "cached": True})
+            return AgentResult(content=cached.content, confidence=cached.confidence, meta={**cached.meta, "cached": True})
+
+        if plan is None:
+            plan = self.classify(question)["plan"]
         trace_print("manager.plan", {"question": question, "plan": plan})
 
         results: List[str] = []
         confs: List[float] = []
 
+        recalled = bool(plan) and plan[0] == "memory"
         try:
-            if plan and plan[0] == "memory":
+            if recalled:
                 # recall first
                 recall = self.memory_agent.recall(question)
                 if recall:
@@ -133,7 +230,12 @@ class Coordinator:
             # persist summary to memory
             self.memory_agent.remember(topic=question, content=final, source_agent="manager", confidence=final_conf, tags=["summary"])
             self.memory.add_message("manager", final, {"confidence": final_conf})
-            return AgentResult(content=final, confidence=final_conf, meta={"plan": plan})
+            result = AgentResult(content=final, confidence=final_conf, meta={"plan": plan})
+            if not recalled:
+                # recall answers depend on what was stored since, so never replay them;
+                # vectorize after remember() so the question's own tokens are in the vocab
+                self.cache.add(self._query_vec(question), result)
+            return result
 
         except Exception as e:
             fallback = f"Encountered an error; providing best-effort summary. Error: {e}"
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import json
 import re
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -22,6 +22,10 @@ class AzureOpenAIClient:
       - AZURE_OPENAI_API_VERSION (e.g., 2024-12-01-preview)
       - AZURE_OPENAI_DEPLOYMENT (deployment name)
       - USE_AZURE_OPENAI ('1' to enable)
+
+    Optional:
+      - AZURE_OPENAI_TIMEOUT (seconds, default 2)
+      - AZURE_OPENAI_MAX_RETRIES (retries on connect errors and 429/5xx with backoff, default 3)
     """
 
     def __init__(self):
@@ -35,47 +39,142 @@ class AzureOpenAIClient:
             self.timeout = float(os.getenv("AZURE_OPENAI_TIMEOUT", "2"))
         except Exception:
             self.timeout = 2.0
+        try:
+            self.max_retries = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "3"))
+        except Exception:
+            self.max_retries = 3
 
-    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 512, top_p: float = 1.0) -> Optional[str]:
-        if not self.enabled:
-            return None
+        # Pooled keep-alive session so repeated calls reuse the TCP/TLS connection
+        self._session = self._build_session() if self.enabled else None
+        # Shared async client, created on first achat() call (bound to that event loop)
+        self._aclient = None
 
+    def _build_session(self):
         import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.max_retries,
+            # a read timeout means the server is slow, not down; retrying it only
+            # multiplies the wait, so just connect errors and 429/5xx are retried
+            read=0,
+            backoff_factor=0.3,
+            # keep our short backoff; a long Retry-After would block the caller
+            respect_retry_after_header=False,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),  # chat completions are POSTs; not retried by default
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)  # e.g. a local proxy or emulator endpoint
+        return session
+
+    def _url(self) -> str:
+        return f"{self.endpoint}/openai/deployments/{self.deployment}/chat/completions?api-version={self.api_version}"
 
-        url = f"{self.endpoint}/openai/deployments/{self.deployment}/chat/completions?api-version={self.api_version}"
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "api-key": self.api_key,
             "Content-Type": "application/json",
         }
-        body = {
+
+    @staticmethod
+    def _body(messages: List[Dict[str, str]], temperature: float, max_tokens: int, top_p: float) -> Dict[str, Any]:
+        return {
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
             "top_p": top_p,
         }
+
+    @staticmethod
+    def _content(data: Dict[str, Any]) -> Optional[str]:
+        return data.get("choices", [{}])[0].get("message", {}).get("content")
+
+    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 512, top_p: float = 1.0, stop_after_array: bool = False) -> Optional[str]:
+        """Return the completion text, or None on any failure.
+
+        With ``stop_after_array`` the response is streamed and parsing stops as soon as
+        the first JSON array is complete; only the text up to its closing ']' is returned.
+        The rest of the stream (bounded by ``max_tokens``) is still drained: closing a
+        half-read response drops the socket instead of returning it to the pool, and a
+        fresh TCP+TLS handshake per call costs more than the few trailing tokens.
+        """
+        if not self.enabled:
+            return None
+
+        body = self._body(messages, temperature, max_tokens, top_p)
         try:
-            resp = requests.post(url, headers=headers, json=body, timeout=self.timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content")
-            return content
+            if not stop_after_array:
+                resp = self._session.post(self._url(), headers=self._headers(), json=body, timeout=self.timeout)
+                resp.raise_for_status()
+                return self._content(resp.json())
+            body["stream"] = True
+            with self._session.post(self._url(), headers=self._headers(), json=body, timeout=self.timeout, stream=True) as resp:
+                resp.raise_for_status()
+                buf, end = "", -1
+                for line in resp.iter_lines(decode_unicode=True):
+                    if end == -1:
+                        buf += _sse_delta(line) or ""
+                        end = _balanced_array_end(buf)
+            return buf[: end + 1] if end != -1 else buf or None
         except Exception:
             return None
 
+    async def achat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 512, top_p: float = 1.0, stop_after_array: bool = False) -> Optional[str]:
+        """Async variant of chat(); concurrent calls share one pooled httpx.AsyncClient.
+
+        ``stop_after_array`` drains the stream the same way, so the connection is reused.
+        """
+        if not self.enabled:
+            return None
+
+        import httpx
+
+        if self._aclient is None:
+            # transport-level retries cover connection failures only
+            transport = httpx.AsyncHTTPTransport(retries=self.max_retries)
+            self._aclient = httpx.AsyncClient(timeout=self.timeout, transport=transport)
+        body = self._body(messages, temperature, max_tokens, top_p)
+        try:
+            if not stop_after_array:
+                resp = await self._aclient.post(self._url(), headers=self._headers(), json=body)
+                resp.raise_for_status()
+                return self._content(resp.json())
+            body["stream"] = True
+            async with self._aclient.stream("POST", self._url(), headers=self._headers(), json=body) as resp:
+                resp.raise_for_status()
+                buf, end = "", -1
+                async for line in resp.aiter_lines():
+                    if end == -1:
+                        buf += _sse_delta(line) or ""
+                        end = _balanced_array_end(buf)
+            return buf[: end + 1] if end != -1 else buf or None
+        except Exception:
+            return None
+
+    async def aclose(self) -> None:
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
 
 class AzureLLM:
     """Compatibility layer used by Coordinator.
 
-    Provides .enabled and .classify_plan(question) using AzureOpenAIClient.
+    Provides .enabled and .classify_plan(question) (plus async .aclassify_plan)
+    using AzureOpenAIClient.
     """
 
     def __init__(self) -> None:
         self.client = AzureOpenAIClient()
         self.enabled = self.client.enabled
 
-    def classify_plan(self, question: str) -> List[str]:
-        if not self.enabled:
-            return []
+    @staticmethod
+    def _plan_messages(question: str) -> List[Dict[str, str]]:
         sys_msg = {
             "role": "system",
             "content": (
@@ -85,14 +184,75 @@ class AzureLLM:
             ),
         }
         user_msg = {"role": "user", "content": f"Question: {question}\nPlan:"}
-        out = self.client.chat([sys_msg, user_msg], temperature=0.0, max_tokens=64)
+        return [sys_msg, user_msg]
+
+    def classify_plan(self, question: str) -> List[str]:
+        if not self.enabled:
+            return []
+        out = self.client.chat(self._plan_messages(question), temperature=0.0, max_tokens=64, stop_after_array=True)
         if not out:
             return []
         return parse_llm_plan(out)
 
+    async def aclassify_plan(self, question: str) -> List[str]:
+        if not self.enabled:
+            return []
+        out = await self.client.achat(self._plan_messages(question), temperature=0.0, max_tokens=64, stop_after_array=True)
+        if not out:
+            return []
+        return parse_llm_plan(out)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+# ---- Streaming utilities ----
+def _sse_delta(line: str) -> Optional[str]:
+    """Content delta carried by one server-sent-events line of a streamed completion."""
+    if not line or not line.startswith("data:"):
+        return None
+    payload = line[5:].strip()
+    if not payload or payload == "[DONE]":
+        return None
+    try:
+        data = json.loads(payload)
+    except Exception:
+        return None
+    # Azure sends a leading chunk with empty choices (content filter results)
+    choices = data.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content")
+
+
+def _balanced_array_end(text: str) -> int:
+    """Index of the ']' closing the first '[' in text, or -1 if not yet closed.
+
+    Brackets inside JSON string literals are ignored.
+    """
+    depth = 0
+    in_str = escaped = False
+    for i, ch in enumerate(text):
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            if depth:
+                in_str = True
+        elif ch == "[":
+            depth += 1
+        elif ch == "]" and depth:
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
 
 # ---- Planning utilities ----
 ALLOWED_STEPS = ("memory", "research", "analysis")
+ALLOWED_SET = frozenset(ALLOWED_STEPS)
 
 
 def _extract_json_array(text: str) -> Optional[str]:
@@ -128,9 +288,14 @@ def parse_llm_plan(text: str) -> List[str]:
     - Max 3 steps; invalid entries are dropped.
     - Returns [] when parsing/validation fails (caller should fallback).
     """
-    raw = _extract_json_array(text)
-    if raw is None:
-        return []
+    stripped = text.strip() if text else ""
+    if stripped.startswith("[") and stripped.endswith("]"):
+        # Fast path: the model returned a bare array, no need to search for one
+        raw: Optional[str] = stripped
+    else:
+        raw = _extract_json_array(text)
+        if raw is None:
+            return []
     try:
         data = json.loads(raw)
     except Exception:
@@ -139,16 +304,6 @@ def parse_llm_plan(text: str) -> List[str]:
     if not isinstance(data, list):
         return []
 
-    normalized: List[str] = []
-    seen = set()
-    for item in data:
-        if not isinstance(item, str):
-            continue
-        step = item.strip().lower()
-        if step in ALLOWED_STEPS and step not in seen:
-            normalized.append(step)
-            seen.add(step)
-        if len(normalized) >= 3:
-            break
-
-    return normalized
+    # dict.fromkeys dedupes while preserving first-seen order
+    steps = dict.fromkeys(item.strip().lower() for item in data if isinstance(item, str))
+    return [step for step in steps if step in ALLOWED_SET][:3]
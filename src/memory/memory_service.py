@@ -1,25 +1,185 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+import json
+import os
+import sqlite3
+
+import numpy as np
+
 from .schemas import Message, KnowledgeRecord, AgentState, now_ts, gen_id, to_dict
 from .vector_store import InMemoryVectorStore
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversation (
+    id TEXT PRIMARY KEY,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS knowledge (
+    id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    content TEXT NOT NULL,
+    source TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    tags TEXT NOT NULL,
+    vec BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+    topic, content, tags, content='knowledge', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS knowledge_ai AFTER INSERT ON knowledge BEGIN
+    INSERT INTO knowledge_fts(rowid, topic, content, tags) VALUES (new.rowid, new.topic, new.content, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS knowledge_ad AFTER DELETE ON knowledge BEGIN
+    INSERT INTO knowledge_fts(knowledge_fts, rowid, topic, content, tags) VALUES ('delete', old.rowid, old.topic, old.content, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS knowledge_au AFTER UPDATE ON knowledge BEGIN
+    INSERT INTO knowledge_fts(knowledge_fts, rowid, topic, content, tags) VALUES ('delete', old.rowid, old.topic, old.content, old.tags);
+    INSERT INTO knowledge_fts(rowid, topic, content, tags) VALUES (new.rowid, new.topic, new.content, new.tags);
+END;
+CREATE TABLE IF NOT EXISTS agent_states (
+    id TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    task TEXT NOT NULL,
+    details TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agent_states_agent ON agent_states(agent);
+CREATE TABLE IF NOT EXISTS vocab (
+    token TEXT PRIMARY KEY,
+    idx INTEGER NOT NULL
+);
+"""
+
+_KNOWLEDGE_COLS = "id, topic, content, source, agent, timestamp, confidence, tags"
+
+
+def _knowledge_row(row: Tuple) -> Dict[str, Any]:
+    meta = dict(zip(("id", "topic", "content", "source", "agent", "timestamp", "confidence", "tags"), row))
+    meta["tags"] = json.loads(meta["tags"])
+    return meta
+
+
+def _index_payload(topic: str, content: str, tags: List[str]) -> Dict[str, Any]:
+    return {"type": "knowledge", "topic": topic, "text_index": f"{topic} {' '.join(tags)} {content}"}
+
+
+def _index_text(topic: str, content: str, tags: List[str]) -> str:
+    return f"{topic}\n{content}\n{' '.join(tags)}"
+
+
+def _pack_vec(idx: np.ndarray, val: np.ndarray) -> bytes:
+    # sparse BLOB layout: n int32 column indices followed by their n float32 values
+    return idx.astype("<i4").tobytes() + val.astype("<f4").tobytes()
+
+
+def _unpack_vec(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(blob) // 8
+    return np.frombuffer(blob, dtype="<i4", count=n), np.frombuffer(blob, dtype="<f4", offset=4 * n)
+
+
 class MemoryService:
-    def __init__(self):
-        self.conversation: List[Dict[str, Any]] = []
-        self.knowledge_meta: Dict[str, Dict[str, Any]] = {}
-        self.agent_states: List[Dict[str, Any]] = []
-        self.vstore = InMemoryVectorStore()
+    """Conversation, knowledge and agent-state memory backed by SQLite.
+
+    ``db_path`` defaults to a private in-memory database; pass a file path to
+    persist memory across runs (WAL mode). Knowledge rows keep their sparse
+    vector as a BLOB of (index, value) pairs and the vocabulary is stored
+    alongside in the same transaction, so the vector
+    store is restored without re-vectorizing. Keyword mode runs on FTS5; hybrid
+    mode fuses vector and BM25 rankings inside the vector store.
+
+    ``seed_cache_dir`` (or ``SEED_CACHE_DIR``) points at a frozen seed knowledge
+    base written by save_seed_cache(); its matrix is memory-mapped at startup
+    instead of re-vectorizing every seed document.
+    """
+
+    def __init__(self, db_path: str | None = None, seed_cache_dir: str | None = None):
+        self.db = sqlite3.connect(db_path or ":memory:")
+        if db_path and db_path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.executescript(_SCHEMA)
+        seed_dir = seed_cache_dir or os.getenv("SEED_CACHE_DIR")
+        if seed_dir and (Path(seed_dir) / "data.npy").exists():
+            self.vstore = InMemoryVectorStore.load(seed_dir)
+            self._load_seed_records(Path(seed_dir) / "knowledge.jsonl")
+        else:
+            self.vstore = InMemoryVectorStore()
+        self._vocab_saved = 0
+        self._restore()
+
+    def _load_seed_records(self, path: Path) -> None:
+        # Seed vectors come from the cache, so their rows carry no BLOB
+        with open(path, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh]
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO knowledge({_KNOWLEDGE_COLS}, vec) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                [(r["id"], r["topic"], r["content"], r["source"], r["agent"], r["timestamp"], r["confidence"], json.dumps(r["tags"])) for r in rows],
+            )
+
+    def _restore(self) -> None:
+        vocab = self.vstore.vec.vocab
+        for token, idx in self.db.execute("SELECT token, idx FROM vocab ORDER BY idx"):
+            known = vocab.get(token)
+            if known is None and idx == len(vocab):
+                vocab[token] = idx
+            elif known != idx:
+                raise ValueError("memory database vocabulary does not match the seed cache; rebuild one of them")
+            self._vocab_saved += 1
+        loaded = set(self.vstore.ids)
+        for iid, topic, content, tags, vec in self.db.execute("SELECT id, topic, content, tags, vec FROM knowledge ORDER BY rowid"):
+            if iid in loaded:
+                continue
+            tags = json.loads(tags)
+            if vec is None:
+                self.vstore.add(iid, _index_payload(topic, content, tags), _index_text(topic, content, tags))
+            else:
+                self.vstore.add_sparse(iid, _index_payload(topic, content, tags), *_unpack_vec(vec))
+        with self.db:
+            self._save_vocab()
+        self._vocab_saved = len(self.vstore.vec.vocab)
+
+    def _save_vocab(self) -> None:
+        # Writes tokens added since the last save; the caller owns the transaction
+        # and bumps _vocab_saved once it has committed.
+        vocab = self.vstore.vec.vocab
+        if len(vocab) > self._vocab_saved:
+            self.db.executemany("INSERT OR REPLACE INTO vocab(token, idx) VALUES (?, ?)", islice(vocab.items(), self._vocab_saved, None))
+
+    def save_seed_cache(self, path: str | Path) -> None:
+        """Freeze the current knowledge base as a seed cache (see ``seed_cache_dir``)."""
+        self.vstore.save(path)
+        rows = self.db.execute(f"SELECT {_KNOWLEDGE_COLS} FROM knowledge ORDER BY rowid")
+        with open(Path(path) / "knowledge.jsonl", "w", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(_knowledge_row(row)) + "\n")
+
+    def close(self) -> None:
+        self.db.close()
 
     # Conversation Memory
     def add_message(self, role: str, content: str, metadata: Dict[str, Any] | None = None) -> str:
         msg = Message(id=gen_id("msg"), role=role, content=content, timestamp=now_ts(), metadata=metadata or {})
-        self.conversation.append(to_dict(msg))
+        with self.db:
+            self.db.execute(
+                "INSERT INTO conversation(id, role, content, timestamp, metadata) VALUES (?, ?, ?, ?, ?)",
+                (msg.id, msg.role, msg.content, msg.timestamp, json.dumps(msg.metadata)),
+            )
         return msg.id
 
     def get_conversation(self) -> List[Dict[str, Any]]:
-        return list(self.conversation)
+        rows = self.db.execute("SELECT id, role, content, timestamp, metadata FROM conversation ORDER BY rowid")
+        return [to_dict(Message(id=i, role=r, content=c, timestamp=t, metadata=json.loads(m))) for i, r, c, t, m in rows]
 
     # Knowledge Base
     def add_knowledge(self, topic: str, content: str, source: str, agent: str, confidence: float, tags: List[str] | None = None) -> str:
@@ -33,37 +193,71 @@ class MemoryService:
             confidence=confidence,
             tags=tags or [],
         )
-        meta = to_dict(rec)
-        self.knowledge_meta[rec.id] = meta
-        self.vstore.add(rec.id, {"type": "knowledge", "topic": topic, "text_index": f"{topic} {' '.join(rec.tags)} {content}"}, f"{topic}\n{content}\n{' '.join(rec.tags)}")
+        vec = self.vstore.vec
+        idx, val = vec.sparse_vectorize_tokens(vec.tokenize_document(_index_text(topic, content, rec.tags)))
+        # row and any new vocab entries commit together, so a restored store never
+        # sees column indices beyond the saved vocabulary
+        with self.db:
+            self.db.execute(
+                f"INSERT INTO knowledge({_KNOWLEDGE_COLS}, vec) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (rec.id, rec.topic, rec.content, rec.source, rec.agent, rec.timestamp, rec.confidence, json.dumps(rec.tags), _pack_vec(idx, val)),
+            )
+            self._save_vocab()
+        self._vocab_saved = len(vec.vocab)
+        self.vstore.add_sparse(rec.id, _index_payload(topic, content, rec.tags), idx, val)
         return rec.id
 
+    def get_knowledge(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        marks = ", ".join("?" * len(ids))
+        rows = self.db.execute(f"SELECT {_KNOWLEDGE_COLS} FROM knowledge WHERE id IN ({marks})", list(ids))
+        return {row[0]: _knowledge_row(row) for row in rows}
+
+    def _fts_search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        tokens = dict.fromkeys(self.vstore.vec.tokenize(query))
+        if not tokens:
+            return []
+        # quote every token so user text cannot inject FTS5 query syntax
+        match = " OR ".join(f'"{t}"' for t in tokens)
+        rows = self.db.execute(
+            "SELECT k.id, bm25(knowledge_fts) AS rank FROM knowledge_fts "
+            "JOIN knowledge k ON k.rowid = knowledge_fts.rowid "
+            "WHERE knowledge_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, top_k),
+        )
+        # FTS5's bm25() is lower-is-better; negate to match the other score conventions
+        return [(iid, -rank) for iid, rank in rows]
+
     def search_knowledge(self, query: str, top_k: int = 5, mode: str = "hybrid") -> List[Dict[str, Any]]:
-        results = []
-        if mode in ("hybrid", "vector"):
-            results.extend(self.vstore.search(query, top_k=top_k))
-        if mode in ("hybrid", "keyword"):
-            results.extend(self.vstore.keyword_search(query, top_k=top_k))
-        # dedupe by id keep best score
-        best: Dict[str, Dict[str, Any]] = {}
-        for iid, payload, score in results:
-            meta = self.knowledge_meta.get(iid)
-            if not meta:
-                continue
-            cur = best.get(iid)
-            if not cur or score > cur["_score"]:
-                best[iid] = {**meta, "_score": score}
-        # sort by score desc
-        ordered = sorted(best.values(), key=lambda x: x["_score"], reverse=True)
-        return ordered[:top_k]
+        if mode == "vector":
+            ranked = [(iid, score) for iid, _, score in self.vstore.search(query, top_k=top_k)]
+        elif mode == "keyword":
+            ranked = self._fts_search(query, top_k)
+        elif mode == "hybrid":
+            # vector + in-memory BM25 fused by rank (RRF) in one pass over the query
+            ranked = [(iid, score) for iid, _, score in self.vstore.hybrid_search(query, top_k=top_k)]
+        else:
+            return []
+        ranked = ranked[:top_k]
+        metas = self.get_knowledge([iid for iid, _ in ranked])
+        return [{**metas[iid], "_score": score} for iid, score in ranked if iid in metas]
 
     # Agent State Memory
     def add_agent_state(self, agent: str, task: str, details: Dict[str, Any]) -> str:
         st = AgentState(id=gen_id("st"), agent=agent, task=task, details=details, timestamp=now_ts())
-        self.agent_states.append(to_dict(st))
+        with self.db:
+            self.db.execute(
+                "INSERT INTO agent_states(id, agent, task, details, timestamp) VALUES (?, ?, ?, ?, ?)",
+                (st.id, st.agent, st.task, json.dumps(st.details), st.timestamp),
+            )
         return st.id
 
     def get_agent_states(self, agent: str | None = None) -> List[Dict[str, Any]]:
-        if not agent:
-            return list(self.agent_states)
-        return [s for s in self.agent_states if s["agent"] == agent]
+        sql = "SELECT id, agent, task, details, timestamp FROM agent_states"
+        params: Tuple = ()
+        if agent:
+            sql += " WHERE agent = ?"
+            params = (agent,)
+        rows = self.db.execute(sql + " ORDER BY rowid", params)
+        return [to_dict(AgentState(id=i, agent=a, task=t, details=json.loads(d), timestamp=ts)) for i, a, t, d, ts in rows]
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
-import uuid
+import secrets
 
 
 def now_ts() -> str:
@@ -12,7 +12,7 @@ def now_ts() -> str:
 
 
 def gen_id(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+    return f"{prefix}_{secrets.token_hex(6)}"
 
 
 @dataclass
@@ -46,4 +46,10 @@ class AgentState:
 
 
 def to_dict(obj) -> Dict[str, Any]:
-    return asdict(obj)
+    # Fields are plain scalars plus one level of list/dict (tags, metadata, details);
+    # copy those containers instead of paying for asdict's recursive deepcopy.
+    out = dict(obj.__dict__)
+    for key, value in out.items():
+        if isinstance(value, (list, dict)):
+            out[key] = value.copy()
+    return out
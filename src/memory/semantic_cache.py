@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_store import cosine
+
+
+class SemanticCache:
+    """Results keyed by query vector; near-duplicate queries reuse a prior result.
+
+    Vectors come from the shared SimpleVectorizer, so entries built against an
+    older (smaller) vocabulary remain comparable with newer ones.
+    """
+
+    def __init__(self, tau: float = 0.92, max_entries: int = 256):
+        self.tau = tau
+        self.max_entries = max_entries
+        self.entries: List[Tuple[np.ndarray, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, query_vec: np.ndarray, result: Any) -> None:
+        if not query_vec.any():
+            # no known tokens: would never match anything
+            return
+        self.entries.append((query_vec, result))
+        if len(self.entries) > self.max_entries:
+            # evict oldest first
+            del self.entries[0]
+
+    def lookup(self, query_vec: np.ndarray, tau: Optional[float] = None) -> Optional[Any]:
+        threshold = self.tau if tau is None else tau
+        best, best_score = None, threshold
+        for vec, result in self.entries:
+            score = cosine(vec, query_vec)
+            if score >= best_score:
+                best, best_score = result, score
+        return best
@@ -1,63 +1,367 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Tuple
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Hashable, Protocol, Sequence, Tuple
+import json
 import math
+import os
 import re
 
+import numpy as np
+from scipy import sparse
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+_WORKERS = os.cpu_count() or 1
+_executor: ThreadPoolExecutor | None = None
+
+
+def _scoring_pool() -> ThreadPoolExecutor:
+    # shared by all stores; SciPy's sparse kernels release the GIL so chunks run in parallel
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="vstore-score")
+    return _executor
+
+
+@lru_cache(maxsize=2048)
+def _tokenize_cached(text: str) -> Tuple[str, ...]:
+    # tuples so cached results can be shared safely between callers
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
 
 class SimpleVectorizer:
     """Lightweight bag-of-words vectorizer with L2 normalization.
 
-    This is an in-memory, dependency-free approximation of a vector store.
-    It supports add/search with cosine similarity based on token counts.
+    This is an in-memory approximation of a vector store. Documents are kept as
+    sparse (index, value) pairs over the shared vocabulary; queries are dense
+    float32 arrays of length ``len(vocab)``. Indices are stable, so a vector built
+    against a smaller vocabulary is simply a zero-padded prefix.
     """
 
     def __init__(self):
         self.vocab: Dict[str, int] = {}
 
     @staticmethod
-    def tokenize(text: str) -> List[str]:
-        return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t]
-
-    def vectorize(self, text: str) -> Dict[int, float]:
-        tokens = self.tokenize(text)
-        counts: Dict[int, int] = {}
-        for t in tokens:
-            idx = self.vocab.setdefault(t, len(self.vocab))
-            counts[idx] = counts.get(idx, 0) + 1
+    def tokenize(text: str) -> Tuple[str, ...]:
+        """Tokenize a query; repeated queries are served from an LRU cache."""
+        return _tokenize_cached(text)
+
+    @staticmethod
+    def tokenize_document(text: str) -> List[str]:
+        """Tokenize document text, which is seen once and would only churn the query cache."""
+        return _TOKEN_RE.findall(text.lower())
+
+    def vectorize(self, text: str, grow: bool = True) -> np.ndarray:
+        """Return an L2-normalized float32 vector of length ``len(self.vocab)``.
+
+        With ``grow=False`` unseen tokens are not added to the vocabulary (use
+        this for queries); they still count toward the norm so cosine scores
+        are not inflated.
+        """
+        return self.vectorize_tokens(self.tokenize(text), grow=grow)
+
+    def vectorize_tokens(self, tokens: Sequence[str], grow: bool = True) -> np.ndarray:
+        """vectorize() for text that has already been tokenized."""
+        idx, val = self.sparse_vectorize_tokens(tokens, grow=grow)
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        vec[idx] = val
+        return vec
+
+    def sparse_vectorize_tokens(self, tokens: Sequence[str], grow: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse form of vectorize_tokens(): sorted int32 indices and float32 values."""
+        counts = Counter(tokens)
+        if grow:
+            for t in counts:
+                self.vocab.setdefault(t, len(self.vocab))
         # L2 normalize
         norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
-        return {i: c / norm for i, c in counts.items()}
+        pairs = sorted((self.vocab[t], c / norm) for t, c in counts.items() if t in self.vocab)
+        idx = np.fromiter((i for i, _ in pairs), dtype=np.int32, count=len(pairs))
+        val = np.fromiter((v for _, v in pairs), dtype=np.float32, count=len(pairs))
+        return idx, val
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    # vectors may come from different vocabulary sizes; the tail of the longer one
+    # only holds tokens the other never saw, so it contributes nothing
+    n = min(a.shape[0], b.shape[0])
+    return float(a[:n] @ b[:n])
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` highest scores, best first (ties by insertion order)."""
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k < n:
+        cand = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        cand = np.arange(n)
+    return cand[np.lexsort((cand, -scores[cand]))]
+
+
+class BM25:
+    """Okapi BM25 over an inverted index of per-document term frequencies.
+
+    Document frequencies and lengths are maintained incrementally; idf values
+    are cached and invalidated whenever a document is added.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)  # token -> [(row, tf)]
+        self.df: Dict[str, int] = {}
+        self.doc_len: List[int] = []
+        self.total_len = 0
+        self._idf: Dict[str, float] = {}
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / len(self.doc_len) if self.doc_len else 0.0
+
+    def add(self, tokens: Sequence[str]) -> None:
+        self.add_counts(Counter(tokens), len(tokens))
+
+    def add_counts(self, tf: Dict[str, int], length: int) -> None:
+        """Add a document from its term frequencies (e.g. restored from disk)."""
+        row = len(self.doc_len)
+        for tok, n in tf.items():
+            self.postings[tok].append((row, n))
+            self.df[tok] = self.df.get(tok, 0) + 1
+        self.doc_len.append(length)
+        self.total_len += length
+        self._idf.clear()
+
+    def doc_counts(self) -> List[Dict[str, int]]:
+        """Per-document term frequencies, rebuilt from the postings."""
+        docs: List[Dict[str, int]] = [{} for _ in self.doc_len]
+        for tok, posting in self.postings.items():
+            for row, n in posting:
+                docs[row][tok] = n
+        return docs
 
+    def idf(self, tok: str) -> float:
+        val = self._idf.get(tok)
+        if val is None:
+            n = len(self.doc_len)
+            df = self.df.get(tok, 0)
+            val = self._idf[tok] = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        return val
 
-def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
-    keys = set(a.keys()) & set(b.keys())
-    return sum(a[k] * b[k] for k in keys)
+    def scores(self, tokens: Sequence[str]) -> Dict[int, float]:
+        """BM25 score per row for every row sharing at least one query token."""
+        out: Dict[int, float] = defaultdict(float)
+        avgdl = self.avgdl or 1.0
+        k1, b = self.k1, self.b
+        for tok in set(tokens):
+            posting = self.postings.get(tok)
+            if not posting:
+                continue
+            idf = self.idf(tok)
+            for row, tf in posting:
+                norm = k1 * (1.0 - b + b * self.doc_len[row] / avgdl)
+                out[row] += idf * tf * (k1 + 1.0) / (tf + norm)
+        return out
+
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse ranked id lists with RRF: score(d) = sum(1 / (k + rank_i(d))), ranks from 1."""
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, iid in enumerate(ranking, start=1):
+            fused[iid] = fused.get(iid, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+class VectorIndex(Protocol):
+    """Nearest-neighbour lookup over an InMemoryVectorStore's rows.
+
+    The store only ships exact search: approximate graph indexes need dense
+    embeddings and lose most of their recall on sparse bag-of-words rows.
+    """
+
+    def query(self, q: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, scores) for the ``top_k`` best rows, best first."""
+        ...
+
+
+class BruteForceIndex:
+    """Exact scoring of every row; the store's matrix is the index."""
+
+    def __init__(self, store: "InMemoryVectorStore"):
+        self.store = store
+
+    def query(self, q: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.store._scores(q)
+        rows = top_k_indices(scores, top_k)
+        return rows, scores[rows]
 
 
 class InMemoryVectorStore:
-    def __init__(self):
+    def __init__(self, parallel_min_rows: int = 20000):
         self.vec = SimpleVectorizer()
-        self.items: List[Tuple[str, Dict[str, Any], Dict[int, float]]] = []
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        # one L2-normalized row per item in CSR layout (indptr/indices/data);
+        # columns follow self.vec.vocab, so memory grows with stored tokens, not N*V.
+        # The arrays are preallocated and doubled on overflow; adds are queued and
+        # copied in by _flush() on the next read.
+        self._indptr: np.ndarray = np.zeros(1, dtype=np.int32)
+        self._indices: np.ndarray = np.zeros(0, dtype=np.int32)
+        self._data: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._rows = 0
+        self._nnz = 0
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._csr: sparse.csr_matrix | None = None
+        # BM25 index over payload["text_index"] for keyword search
+        self.bm25 = BM25()
+        self._index: VectorIndex = BruteForceIndex(self)
+        # below this many rows thread dispatch costs more than it saves
+        self.parallel_min_rows = parallel_min_rows
+
+    def __len__(self) -> int:
+        return len(self.ids)
 
     def add(self, item_id: str, payload: Dict[str, Any], text: str) -> None:
-        v = self.vec.vectorize(text)
-        self.items.append((item_id, payload, v))
+        self.add_sparse(item_id, payload, *self.vec.sparse_vectorize_tokens(self.vec.tokenize_document(text)))
+
+    def add_sparse(self, item_id: str, payload: Dict[str, Any], indices: np.ndarray, values: np.ndarray) -> None:
+        """Add an item from sorted column indices and their L2-normalized values."""
+        self._pending.append((indices, values))
+        self.ids.append(item_id)
+        self.payloads.append(payload)
+        self.bm25.add(self.vec.tokenize_document(payload.get("text_index", "")))
+
+    @property
+    def matrix(self) -> sparse.csr_matrix:
+        """Stored rows as an (N, V) CSR matrix over views of the buffers, V == len(self.vec.vocab)."""
+        if self._pending:
+            self._flush()
+        shape = (self._rows, len(self.vec.vocab))
+        if self._csr is None or self._csr.shape != shape:
+            self._csr = sparse.csr_matrix(
+                (self._data[: self._nnz], self._indices[: self._nnz], self._indptr[: self._rows + 1]),
+                shape=shape,
+                copy=False,
+            )
+        return self._csr
+
+    @staticmethod
+    def _grow(arr: np.ndarray, used: int, need: int) -> np.ndarray:
+        # a loaded (memory-mapped, read-only) array is copied on the first write
+        if need <= arr.shape[0] and arr.flags.writeable:
+            return arr
+        grown = np.zeros(max(need, 2 * arr.shape[0], 64), dtype=arr.dtype)
+        grown[:used] = arr[:used]
+        return grown
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        rows = self._rows + len(pending)
+        nnz = self._nnz + sum(idx.shape[0] for idx, _ in pending)
+        self._indptr = self._grow(self._indptr, self._rows + 1, rows + 1)
+        self._indices = self._grow(self._indices, self._nnz, nnz)
+        self._data = self._grow(self._data, self._nnz, nnz)
+        pos = self._nnz
+        for row, (idx, val) in enumerate(pending, start=self._rows):
+            end = pos + idx.shape[0]
+            self._indices[pos:end] = idx
+            self._data[pos:end] = val
+            self._indptr[row + 1] = end
+            pos = end
+        self._rows, self._nnz = rows, nnz
+        self._csr = None
+
+    def _row_block(self, start: int, stop: int) -> sparse.csr_matrix:
+        """Rows [start, stop) as a CSR matrix sharing the stored index/value arrays."""
+        csr = self.matrix
+        lo, hi = csr.indptr[start], csr.indptr[stop]
+        return sparse.csr_matrix(
+            (csr.data[lo:hi], csr.indices[lo:hi], csr.indptr[start : stop + 1] - lo),
+            shape=(stop - start, csr.shape[1]),
+            copy=False,
+        )
 
     def search(self, query: str, top_k: int = 5) -> List[Tuple[str, Dict[str, Any], float]]:
-        q = self.vec.vectorize(query)
-        scored = [(iid, payload, cosine(q, v)) for iid, payload, v in self.items]
-        scored.sort(key=lambda x: x[2], reverse=True)
-        return scored[:top_k]
+        if not self.ids:
+            return []
+        q = self.vec.vectorize(query, grow=False)
+        rows, scores = self._index.query(q, top_k)
+        return [(self.ids[i], self.payloads[i], float(s)) for i, s in zip(rows, scores)]
+
+    def _scores(self, q: np.ndarray) -> np.ndarray:
+        n = self.matrix.shape[0]
+        parallel = _WORKERS > 1 and n >= self.parallel_min_rows
+        step = -(-n // _WORKERS) if parallel else max(n, 1)
+        chunks = [self._row_block(i, min(i + step, n)) for i in range(0, n, step)]
+
+        def score_chunk(rows: sparse.csr_matrix) -> np.ndarray:
+            return rows @ q
+
+        if parallel and len(chunks) > 1:
+            parts = list(_scoring_pool().map(score_chunk, chunks))
+        else:
+            parts = [score_chunk(c) for c in chunks]
+        return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, dtype=np.float32)
 
     def keyword_search(self, query: str, top_k: int = 5) -> List[Tuple[str, Dict[str, Any], float]]:
-        q_tokens = set(self.vec.tokenize(query))
-        results = []
-        for iid, payload, v in self.items:
-            text = payload.get("text_index", "")
-            tokens = set(self.vec.tokenize(text))
-            overlap = len(q_tokens & tokens)
-            if overlap:
-                results.append((iid, payload, float(overlap)))
-        results.sort(key=lambda x: x[2], reverse=True)
-        return results[:top_k]
+        ranked = self._keyword_rows(self.vec.tokenize(query), top_k)
+        return [(self.ids[i], self.payloads[i], n) for i, n in ranked]
+
+    def _keyword_rows(self, tokens: Sequence[str], top_k: int) -> List[Tuple[int, float]]:
+        scores = self.bm25.scores(tokens)
+        # sort on (score, row) so ties favour older items, as in search()
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:top_k]
+
+    def hybrid_search(self, query: str, top_k: int = 5, k: int = 60) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Vector and BM25 rankings fused with RRF, from a single tokenization of the query."""
+        if not self.ids:
+            return []
+        tokens = self.vec.tokenize(query)
+        vec_rows, _ = self._index.query(self.vec.vectorize_tokens(tokens, grow=False), top_k)
+        lex_rows = [row for row, _ in self._keyword_rows(tokens, top_k)]
+        fused = reciprocal_rank_fusion([vec_rows.tolist(), lex_rows], k=k)[:top_k]
+        return [(self.ids[i], self.payloads[i], score) for i, score in fused]
+
+    # Persistence: indptr.npy/indices.npy/data.npy + vocab.json + metadata.jsonl
+    def save(self, path: str | Path) -> None:
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        csr = self.matrix
+        np.save(out / "indptr.npy", csr.indptr)
+        np.save(out / "indices.npy", csr.indices)
+        np.save(out / "data.npy", csr.data)
+        (out / "vocab.json").write_text(json.dumps(list(self.vec.vocab)), encoding="utf-8")
+        with open(out / "metadata.jsonl", "w", encoding="utf-8") as fh:
+            for iid, payload, tf, length in zip(self.ids, self.payloads, self.bm25.doc_counts(), self.bm25.doc_len):
+                fh.write(json.dumps({"id": iid, "payload": payload, "tf": tf, "len": length}) + "\n")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True, **kwargs: Any) -> "InMemoryVectorStore":
+        """Load a store written by save() without re-tokenizing or re-vectorizing.
+
+        With ``mmap`` the matrix arrays stay on disk and page in as search touches
+        them; they are copied into memory only when new items are added.
+        """
+        src = Path(path)
+        mode = "r" if mmap else None
+        data = np.load(src / "data.npy", mmap_mode=mode)
+        store = cls(**kwargs)
+        store.vec.vocab = {tok: i for i, tok in enumerate(json.loads((src / "vocab.json").read_text(encoding="utf-8")))}
+        store._data = data
+        store._indices = np.load(src / "indices.npy", mmap_mode=mode)
+        store._indptr = np.load(src / "indptr.npy", mmap_mode=mode)
+        store._rows, store._nnz = store._indptr.shape[0] - 1, data.shape[0]
+        with open(src / "metadata.jsonl", encoding="utf-8") as fh:
+            for line in fh:
+                rec = json.loads(line)
+                store.ids.append(rec["id"])
+                store.payloads.append(rec["payload"])
+                store.bm25.add_counts(rec["tf"], rec["len"])
+        return store
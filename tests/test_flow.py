@@ -14,3 +14,49 @@ def test_basic_flow():
     q2 = "What did we discuss about neural networks earlier?"
     out2 = coord.handle(q2)
     assert "Recall:" in out2.content or out2.confidence >= 0
+
+
+def test_async_plan_then_handle_matches_sync_handle():
+    import asyncio
+
+    q = "Compare two approaches and recommend one."
+    sync_out = Coordinator(MemoryService()).handle(q)
+    coord = Coordinator(MemoryService())
+    plan = asyncio.run(coord.aclassify(q))["plan"]
+    async_out = coord.handle(q, plan=plan)
+    assert plan == ["analysis"]
+    assert (async_out.content, async_out.confidence, async_out.meta) == (sync_out.content, sync_out.confidence, sync_out.meta)
+
+
+def test_rule_plan_same_with_and_without_automaton(monkeypatch):
+    import src.agents as agents
+
+    questions = [
+        "What did we discuss about papers earlier? Summarize.",
+        "Compare two approaches and recommend one.",
+        "Tell me a story.",
+    ]
+    with_ac = [Coordinator._rule_plan(q)["plan"] for q in questions]
+    monkeypatch.setattr(agents, "_AC", None)
+    without_ac = [Coordinator._rule_plan(q)["plan"] for q in questions]
+    assert with_ac == without_ac
+    assert with_ac[0] == ["memory", "research", "analysis"]
+    assert with_ac[2] == ["research", "analysis"]
+
+
+def test_llm_plans_cached_by_normalized_question():
+    mem = MemoryService()
+    coord = Coordinator(mem)
+    calls = []
+
+    class FakeLLM:
+        enabled = True
+
+        def classify_plan(self, question):
+            calls.append(question)
+            return ["analysis"]
+
+    coord.azure_llm = FakeLLM()
+    assert coord.classify("Compare A and B")["plan"] == ["analysis"]
+    assert coord.classify("  compare a and b ")["plan"] == ["analysis"]
+    assert len(calls) == 1
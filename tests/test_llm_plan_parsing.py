@@ -34,3 +34,103 @@ def test_parse_malformed_json():
 
 def test_parse_no_array_found():
     assert parse_llm_plan('No list here, just text') == []
+
+
+def test_balanced_array_end_ignores_brackets_in_strings():
+    from src.llm.azure_openai import _balanced_array_end
+
+    assert _balanced_array_end('Plan: ["research", "analysis"] trailing') == 29
+    assert _balanced_array_end('["a]b", "c"') == -1
+    assert _balanced_array_end('["a]b", "c"]') == 11
+    assert _balanced_array_end("no array") == -1
+
+
+def test_sse_delta_extracts_content():
+    from src.llm.azure_openai import _sse_delta
+
+    assert _sse_delta('data: {"choices": [{"delta": {"content": "[\\"res"}}]}') == '["res'
+    assert _sse_delta('data: {"choices": [], "prompt_filter_results": []}') is None
+    assert _sse_delta("data: [DONE]") is None
+    assert _sse_delta("") is None
+
+
+def _sse_stub_server():
+    """Local chat-completions stub that streams a plan and counts TCP connections."""
+    import http.server
+    import json
+    import threading
+    import time
+
+    events = [{"choices": [{"delta": {"content": piece}}]} for piece in ('["research", ', '"analysis"]', " because the task", " needs both.")]
+    chunks = [f"data: {json.dumps(e)}\n\n".encode() for e in events] + [b"data: [DONE]\n\n"]
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        connections = 0
+
+        def setup(self):
+            super().setup()
+            Handler.connections += 1
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+                time.sleep(0.01)
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler
+
+
+def _stub_llm(monkeypatch, port):
+    from src.llm.azure_openai import AzureLLM
+
+    for key, value in {
+        "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{port}",
+        "AZURE_OPENAI_API_KEY": "test",
+        "AZURE_OPENAI_API_VERSION": "2024-01-01",
+        "AZURE_OPENAI_DEPLOYMENT": "stub",
+        "USE_AZURE_OPENAI": "1",
+    }.items():
+        monkeypatch.setenv(key, value)
+    return AzureLLM()
+
+
+def test_streamed_plans_reuse_the_connection(monkeypatch):
+    server, handler = _sse_stub_server()
+    try:
+        llm = _stub_llm(monkeypatch, server.server_port)
+        plans = [llm.classify_plan(q) for q in ("first", "second", "third")]
+    finally:
+        server.shutdown()
+    assert plans == [["research", "analysis"]] * 3
+    assert handler.connections == 1
+
+
+def test_async_streamed_plans_reuse_the_connection(monkeypatch):
+    import asyncio
+
+    server, handler = _sse_stub_server()
+
+    async def run(llm):
+        try:
+            return [await llm.aclassify_plan(q) for q in ("first", "second", "third")]
+        finally:
+            await llm.aclose()
+
+    try:
+        plans = asyncio.run(run(_stub_llm(monkeypatch, server.server_port)))
+    finally:
+        server.shutdown()
+    assert plans == [["research", "analysis"]] * 3
+    assert handler.connections == 1
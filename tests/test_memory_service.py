@@ -0,0 +1,57 @@
+from src.memory.memory_service import MemoryService
+
+
+def test_knowledge_persists_across_instances(tmp_path):
+    db = str(tmp_path / "memory.db")
+    mem = MemoryService(db)
+    kid = mem.add_knowledge("transformers", "Attention-based sequence models.", "seed", "research", 0.8, ["nlp"])
+    mem.add_message("user", "hello", {"k": 1})
+    mem.close()
+
+    mem = MemoryService(db)
+    hits = mem.search_knowledge("attention models", top_k=3)
+    assert hits and hits[0]["id"] == kid
+    assert hits[0]["tags"] == ["nlp"]
+    assert mem.get_conversation()[0]["metadata"] == {"k": 1}
+    # restored vectors line up with the persisted vocabulary
+    assert mem.search_knowledge("attention models", mode="vector")[0]["_score"] > 0.5
+
+
+def test_knowledge_vector_blob_is_sparse():
+    mem = MemoryService()
+    mem.add_knowledge("gardening", "Tomatoes need sun.", "seed", "research", 0.7)
+    kid = mem.add_knowledge("transformers", "Attention models.", "seed", "research", 0.8)
+    (blob,) = mem.db.execute("SELECT vec FROM knowledge WHERE id = ?", (kid,)).fetchone()
+    # one (int32, float32) pair per distinct token, not one float per vocab entry
+    assert len(blob) == 8 * 3
+    assert mem.db.execute("SELECT COUNT(*) FROM vocab").fetchone()[0] == len(mem.vstore.vec.vocab)
+
+
+def test_keyword_mode_uses_fts_and_ignores_query_syntax():
+    mem = MemoryService()
+    mem.add_knowledge("reinforcement learning", "Policy gradients and rewards.", "seed", "research", 0.7)
+    mem.add_knowledge("gardening", "Tomatoes need sun.", "seed", "research", 0.7)
+    hits = mem.search_knowledge('rewards" OR NOT (', mode="keyword")
+    assert [h["topic"] for h in hits] == ["reinforcement learning"]
+    assert mem.search_knowledge("???", mode="keyword") == []
+
+
+def test_seed_cache_roundtrip(tmp_path):
+    seed_dir = tmp_path / "seed"
+    builder = MemoryService()
+    kid = builder.add_knowledge("transformers", "Attention-based sequence models.", "seed", "seed", 0.9, ["nlp"])
+    builder.add_knowledge("gardening", "Tomatoes need sun.", "seed", "seed", 0.9)
+    builder.save_seed_cache(seed_dir)
+
+    db = str(tmp_path / "memory.db")
+    mem = MemoryService(db, seed_cache_dir=str(seed_dir))
+    assert mem.vstore.ids[0] == kid
+    assert mem.search_knowledge("attention models", top_k=1)[0]["id"] == kid
+    assert mem.search_knowledge("tomatoes", mode="keyword")[0]["topic"] == "gardening"
+    added = mem.add_knowledge("reinforcement learning", "Policy gradients.", "research_agent", "research", 0.6)
+    mem.close()
+
+    # reopening with the same seeds keeps seed rows once and restores the new row
+    mem = MemoryService(db, seed_cache_dir=str(seed_dir))
+    assert mem.vstore.ids == [kid, mem.vstore.ids[1], added]
+    assert mem.search_knowledge("policy gradients", top_k=1)[0]["id"] == added
@@ -19,3 +19,24 @@ def test_memory_roundtrip():
     # recall
     res = coord.handle("What did we discuss about neural networks earlier?")
     assert "Recall" in res.content or res.confidence > 0
+
+
+def test_repeated_question_served_from_cache():
+    mem = MemoryService()
+    coord = Coordinator(mem)
+    q = "Compare CNNs and RNNs for sequence tasks."
+    first = coord.handle(q)
+    again = coord.handle(q)
+    assert not first.meta.get("cached")
+    assert again.meta.get("cached")
+    assert again.content == first.content
+
+
+def test_recall_question_bypasses_cache():
+    mem = MemoryService()
+    coord = Coordinator(mem)
+    coord.handle("neural network transformer attention models architecture efficiency tradeoffs")
+    mem.add_knowledge("transformer attention", "Sparse attention cuts cost.", "user", "user", 0.9)
+    res = coord.handle("recall neural network transformer attention models architecture efficiency tradeoffs")
+    assert not res.meta.get("cached")
+    assert "Sparse attention cuts cost." in res.content
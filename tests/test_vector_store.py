@@ -0,0 +1,66 @@
+from src.memory.vector_store import InMemoryVectorStore, reciprocal_rank_fusion
+
+
+def test_search_ranks_by_cosine():
+    vs = InMemoryVectorStore()
+    vs.add("a", {"text_index": "cats"}, "cats and dogs")
+    vs.add("b", {"text_index": "transformers"}, "transformer attention models")
+    vs.add("c", {"text_index": "cats"}, "cats cats cats")
+    res = vs.search("cats", top_k=2)
+    assert [r[0] for r in res] == ["c", "a"]
+    assert res[0][2] > res[1][2] > 0
+
+
+def test_search_does_not_grow_vocab():
+    vs = InMemoryVectorStore()
+    vs.add("a", {}, "neural networks")
+    size = len(vs.vec.vocab)
+    vs.search("completely unseen words")
+    assert len(vs.vec.vocab) == size
+    assert vs.matrix.shape == (1, size)
+
+
+def test_keyword_search_ranks_with_bm25():
+    vs = InMemoryVectorStore()
+    vs.add("a", {"text_index": "neural networks overview"}, "ignored")
+    vs.add("b", {"text_index": "convolutional neural networks"}, "ignored")
+    vs.add("c", {"text_index": "gardening tips"}, "ignored")
+    res = vs.keyword_search("convolutional neural networks", top_k=5)
+    assert [r[0] for r in res] == ["b", "a"]
+    assert res[0][2] > res[1][2] > 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+    assert fused[0][0] == "b"
+    assert {iid for iid, _ in fused} == {"a", "b", "c", "d"}
+
+
+def test_parallel_scoring_matches_serial():
+    serial, parallel = InMemoryVectorStore(), InMemoryVectorStore(parallel_min_rows=1)
+    for i in range(50):
+        text = f"item{i} group{i % 5} common"
+        serial.add(str(i), {}, text)
+        parallel.add(str(i), {}, text)
+    assert serial.search("group2 common", top_k=10) == parallel.search("group2 common", top_k=10)
+
+
+def test_buffered_adds_flush_on_read():
+    vs = InMemoryVectorStore()
+    for i in range(100):
+        vs.add(str(i), {}, f"doc{i} shared")
+    assert len(vs) == 100
+    assert vs.matrix.shape == (100, len(vs.vec.vocab))
+    assert vs._indptr.shape[0] > 100
+    vs.add("late", {}, "late arrival")
+    assert vs.search("late arrival", top_k=1)[0][0] == "late"
+
+
+def test_hybrid_search_fuses_vector_and_bm25():
+    vs = InMemoryVectorStore()
+    vs.add("a", {"text_index": "transformer attention"}, "transformer attention")
+    vs.add("b", {"text_index": "gardening"}, "gardening")
+    vs.add("c", {"text_index": "attention span"}, "attention span")
+    res = vs.hybrid_search("transformer attention", top_k=2)
+    assert [r[0] for r in res] == ["a", "c"]
+    assert res[0][2] == 2 / 61